@@ -0,0 +1,350 @@
+from aws_cdk import aws_iam
+from constructs import Construct
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_glue as glue
+from aws_cdk import aws_athena as athena
+from aws_cdk import aws_lakeformation as lf
+from aws_cdk.aws_events import Rule, Schedule
+from aws_cdk import Stack, Duration, aws_lambda
+from aws_cdk.aws_events_targets import LambdaFunction
+from api_consumer.rightsizing import load_profile, WRANGLER_LAYERS
+
+# column shared by the hot and cold datasets to join them back
+ROW_KEY = "row_key"
+
+# glue table formats: (classification, input format, output format, serde)
+JSON_FORMAT = (
+    "json",
+    "org.apache.hadoop.mapred.TextInputFormat",
+    "org.apache.hadoop.hive.ql.io.HiveIgnoreKeyTextOutputFormat",
+    "org.openx.data.jsonserde.JsonSerDe",
+)
+PARQUET_FORMAT = (
+    "parquet",
+    "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+    "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+    "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe",
+)
+
+
+class ApiConsumerStack(Stack):
+    # lambda consumer, results bucket, glue catalog, lake formation grants and
+    # athena workgroup for one API dataset. Construct ids derive from `name`,
+    # `logical_ids` maps a derived id to the one already deployed.
+
+    def __init__(
+        self,
+        scope: Construct,
+        construct_id: str,
+        *,
+        name: str,
+        dataset: str,
+        endpoint: str,
+        handler: str,
+        glue_db_name: str,
+        columns: list,
+        cold_columns: list,
+        proxy_secret: bool = False,
+        logical_ids: dict = None,
+        **kwargs,
+    ) -> None:
+        super().__init__(scope, construct_id, **kwargs)
+        self._logical_ids = logical_ids or {}
+        table_name = f"api_consumer_{dataset}"
+
+        # create the bucket to store response data
+        results_bucket = s3.Bucket(self, self._id(f"{name}ResultsBucket"))
+
+        # size the function from the right-sizing profile
+        function_id = self._id(f"HttpConsumer{name}Function")
+        profile = load_profile(self.node.try_get_context("lambda_profile"), function_id)
+        architectures = {"x86_64": aws_lambda.Architecture.X86_64, "arm64": aws_lambda.Architecture.ARM_64}
+
+        # deploy the function to consume API endpoint
+        consumer_fn = aws_lambda.Function(
+            self,
+            function_id,
+            runtime=aws_lambda.Runtime.PYTHON_3_11,
+            handler=handler,
+            timeout=Duration.seconds(profile["timeout"]),
+            memory_size=profile["memory_size"],
+            architecture=architectures[profile["architecture"]],
+            code=aws_lambda.Code.from_asset("lambda"),
+            environment={
+                "ENDPOINT_URL": endpoint,
+                "S3_BUCKET": results_bucket.bucket_name,
+                "S3_PREFIX": f"{dataset}/",
+                "S3_COLD_PREFIX": f"{dataset}_pii/",
+                "S3_RAW_PREFIX": f"{dataset}_raw/",
+                "IDEMPOTENT_WRITES": "true",
+            },
+        )
+
+        if proxy_secret:
+            consumer_fn.add_to_role_policy(
+                aws_iam.PolicyStatement(
+                    actions=["secretsmanager:GetSecretValue"],
+                    resources=[
+                        "arn:aws:secretsmanager:*:*:secret:PROXY_URL*",
+                    ],
+                )
+            )
+
+        # add wrangler layer to the lambda
+        arn_layer = self.node.try_get_context(WRANGLER_LAYERS[profile["architecture"]])
+        dw_layer = aws_lambda.LayerVersion.from_layer_version_arn(self, "DataWranglerLayer", arn_layer)
+        consumer_fn.add_layers(dw_layer)
+
+        # add permission to lambda put values in bucket
+        results_bucket.grant_put(consumer_fn)
+
+        # idempotent writes check existing objects before putting them
+        results_bucket.grant_read(consumer_fn)
+
+        # raw responses are only kept for retries of the same run, well past the
+        # eventbridge and lambda retry windows. The crawler does not target them
+        results_bucket.add_lifecycle_rule(prefix=f"{dataset}_raw/", expiration=Duration.days(7))
+
+        # create a rule for schenduled trigger function
+        Rule(
+            self,
+            self._id(f"{name}Schedule"),
+            schedule=Schedule.rate(Duration.minutes(60 * 24)),
+            targets=[LambdaFunction(consumer_fn)],
+        )
+
+        # create a glue database
+        glue_db = glue.CfnDatabase(
+            self,
+            self._id(f"{name}GlueDatabase"),
+            catalog_id=Stack.of(self).account,
+            database_input=glue.CfnDatabase.DatabaseInputProperty(name=glue_db_name),
+        )
+
+        # create glue tables for the hot (analytic) and cold (PII/blob) datasets.
+        # The hot table keeps the descriptor it was deployed with, the cold one is
+        # new and matches the parquet objects the handlers write
+        hot_columns = [ROW_KEY] + [x for x, _ in columns if x not in cold_columns]
+        column_types = dict(columns, **{ROW_KEY: "string"})
+        tables = [
+            (self._id(f"{name}GlueTable"), table_name, f"{dataset}/", hot_columns, JSON_FORMAT),
+            (
+                self._id(f"{name}PiiGlueTable"),
+                f"{table_name}_pii",
+                f"{dataset}_pii/",
+                [ROW_KEY] + cold_columns,
+                PARQUET_FORMAT,
+            ),
+        ]
+        for table_id, table, table_prefix, table_columns, table_format in tables:
+            classification, input_format, output_format, serde = table_format
+            glue.CfnTable(
+                self,
+                table_id,
+                catalog_id=Stack.of(self).account,
+                database_name=glue_db_name,
+                table_input=glue.CfnTable.TableInputProperty(
+                    name=table,
+                    table_type="EXTERNAL_TABLE",
+                    parameters={"classification": classification},
+                    partition_keys=[
+                        glue.CfnTable.ColumnProperty(name="partition_0", type="string"),
+                        glue.CfnTable.ColumnProperty(name="partition_1", type="string"),
+                        glue.CfnTable.ColumnProperty(name="partition_2", type="string"),
+                    ],
+                    storage_descriptor=glue.CfnTable.StorageDescriptorProperty(
+                        location=f"s3://{results_bucket.bucket_name}/{table_prefix}",
+                        input_format=input_format,
+                        output_format=output_format,
+                        serde_info=glue.CfnTable.SerdeInfoProperty(serialization_library=serde),
+                        columns=[
+                            glue.CfnTable.ColumnProperty(name=x, type=column_types[x])
+                            for x in table_columns
+                        ]
+                    ),
+                ),
+            )
+
+        # Allow glue to read S3 data
+        glue_role = aws_iam.Role(
+            self,
+            self._id(f"Api{name}GlueCrawlerRole"),
+            assumed_by=aws_iam.ServicePrincipal("glue.amazonaws.com"),
+            managed_policies=[
+                aws_iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AWSGlueServiceRole"),
+            ],
+        )
+        results_bucket.grant_read(glue_role)
+
+        # create a crawler to ingest s3 files to glue
+        crawler = glue.CfnCrawler(
+            self,
+            self._id(f"Api{name}GlueCrawler"),
+            role=glue_role.role_arn,
+            database_name=glue_db_name,
+            table_prefix="api_consumer_",
+            targets=glue.CfnCrawler.TargetsProperty(
+                s3_targets=[
+                    glue.CfnCrawler.S3TargetProperty(path=f"s3://{results_bucket.bucket_name}/{dataset}/"),
+                    glue.CfnCrawler.S3TargetProperty(path=f"s3://{results_bucket.bucket_name}/{dataset}_pii/"),
+                ]
+            ),
+            schedule=glue.CfnCrawler.ScheduleProperty(schedule_expression="cron(0 1 * * ? *)"),
+            schema_change_policy=glue.CfnCrawler.SchemaChangePolicyProperty(
+                delete_behavior="LOG",
+                update_behavior="UPDATE_IN_DATABASE",
+            ),
+        )
+        crawler.add_dependency(glue_db)
+
+        # Register S3 location in lake formation
+        lf.CfnResource(
+            self,
+            "LfRegisterBucket",
+            resource_arn=f"arn:aws:s3:::{results_bucket.bucket_name}",
+            use_service_linked_role=True,
+        )
+
+        # Grant Data Location permissions to Glue
+        lf.CfnPermissions(
+            self,
+            "LfPermsDataLocationCrawler",
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=glue_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                data_location_resource=lf.CfnPermissions.DataLocationResourceProperty(
+                    s3_resource=f"arn:aws:s3:::{results_bucket.bucket_name}"
+                )
+            ),
+            permissions=["DATA_LOCATION_ACCESS"],
+        )
+
+        # Database-level perms for crawler to create/update tables
+        lf.CfnPermissions(
+            self,
+            "LfPermsDatabaseCrawler",
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=glue_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                database_resource=lf.CfnPermissions.DatabaseResourceProperty(
+                    catalog_id=Stack.of(self).account,
+                    name=glue_db_name,
+                )
+            ),
+            permissions=["CREATE_TABLE", "ALTER", "DROP", "DESCRIBE"],
+        )
+
+        # Create an Athena query role and grant Lake Formation permissions to query the data
+        athena_role = aws_iam.Role(
+            self,
+            self._id(f"{name}AthenaQueryRole"),
+            assumed_by=aws_iam.AccountPrincipal(account_id=Stack.of(self).account),
+            managed_policies=[
+                aws_iam.ManagedPolicy.from_aws_managed_policy_name("AmazonAthenaFullAccess"),
+            ],
+        )
+
+        # Give S3 read permissions for query outputs and data (read-only)
+        results_bucket.grant_read(athena_role)
+
+        # allow Athena role to DESCRIBE DB and SELECT on all tables in DB
+        lf.CfnPermissions(
+            self,
+            "LfPermsDatabaseAthenaDescribe",
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=athena_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                database_resource=lf.CfnPermissions.DatabaseResourceProperty(
+                    catalog_id=Stack.of(self).account,
+                    name=glue_db_name,
+                )
+            ),
+            permissions=["DESCRIBE"],
+        )
+
+        # allow athena role to DESCRIBE the specific table (required for UI listing)
+        lf.CfnPermissions(
+            self,
+            "LfPermsTablesAthenaSelectAll",
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=athena_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                table_resource=lf.CfnPermissions.TableResourceProperty(
+                    catalog_id=Stack.of(self).account,
+                    database_name=glue_db_name,
+                    table_wildcard={},
+                )
+            ),
+            permissions=["DESCRIBE"],
+        )
+
+        # Grant SELECT to Athena on the analytic columns of the hot table. Objects
+        # written before the split still hold the PII columns and the crawler can
+        # add them back to the table, so they stay excluded here too.
+        lf.CfnPermissions(
+            self,
+            self._id(f"LfPermsAthenaSelect{name}Columns"),
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=athena_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                table_with_columns_resource=lf.CfnPermissions.TableWithColumnsResourceProperty(
+                    catalog_id=Stack.of(self).account,
+                    database_name=glue_db_name,
+                    name=table_name,
+                    column_wildcard=lf.CfnPermissions.ColumnWildcardProperty(
+                        excluded_column_names=cold_columns
+                    )
+                )
+            ),
+            permissions=["SELECT"],
+        )
+
+        # On the cold table Athena only sees the row key, sensitive columns stay excluded
+        lf.CfnPermissions(
+            self,
+            self._id(f"LfPermsAthenaSelect{name}PiiColumns"),
+            data_lake_principal=lf.CfnPermissions.DataLakePrincipalProperty(
+                data_lake_principal_identifier=athena_role.role_arn
+            ),
+            resource=lf.CfnPermissions.ResourceProperty(
+                table_with_columns_resource=lf.CfnPermissions.TableWithColumnsResourceProperty(
+                    catalog_id=Stack.of(self).account,
+                    database_name=glue_db_name,
+                    name=f"{table_name}_pii",
+                    column_wildcard=lf.CfnPermissions.ColumnWildcardProperty(
+                        excluded_column_names=cold_columns
+                    )
+                )
+            ),
+            permissions=["SELECT"],
+        )
+
+        athena_results_bucket = s3.Bucket(self, self._id(f"{name}AthenaResultsBucket"))
+
+        # Allow the Athena role to read/write query results
+        athena_results_bucket.grant_read_write(athena_role)
+
+        # Create an Athena WorkGroup with S3 results location
+        athena.CfnWorkGroup(
+            self,
+            self._id(f"{name}AthenaWorkGroup"),
+            name=f"{name}WG",
+            work_group_configuration=athena.CfnWorkGroup.WorkGroupConfigurationProperty(
+                enforce_work_group_configuration=True,
+                result_configuration=athena.CfnWorkGroup.ResultConfigurationProperty(
+                    output_location=f"s3://{athena_results_bucket.bucket_name}/results/",
+                    encryption_configuration=athena.CfnWorkGroup.EncryptionConfigurationProperty(
+                        encryption_option="SSE_S3"
+                    ),
+                ),
+            ),
+            state="ENABLED",
+        )
+
+    def _id(self, construct_id):
+        return self._logical_ids.get(construct_id, construct_id)
@@ -0,0 +1,295 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import importlib
+import subprocess
+from threading import Thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lambda")
+
+# memory size at which lambda allocates one full vCPU
+FULL_VCPU_MB = 1769
+
+# function construct id -> (handler module, synthetic payload)
+FUNCTIONS = {
+    "HttpConsumerJSONPlaceholderFunction": ("handler", "jsonplaceholder"),
+    "HttpConsumerRandomUserFunction": ("handler_with_proxy", "randomuser"),
+}
+
+DEFAULT_PROFILE = {"memory_size": 128, "timeout": 60, "architecture": "x86_64"}
+
+# layer context key per architecture
+WRANGLER_LAYERS = {"x86_64": "wrangler_layer", "arm64": "wrangler_layer_arm64"}
+
+
+def load_profile(path, function_id):
+    # settings for a function from a profile file, defaults when missing
+    profile = dict(DEFAULT_PROFILE)
+    if path and os.path.exists(path):
+        with open(path) as f:
+            profile.update(json.load(f).get(function_id, {}))
+    return profile
+
+
+def _hex(rnd, name):
+    return hashlib.sha256(f"{name}{rnd.random()}".encode()).hexdigest()
+
+
+def _randomuser(rnd, i):
+    return {
+        "gender": rnd.choice(["female", "male"]),
+        "name": {"title": "Mx", "first": f"first{i}", "last": f"last{i}"},
+        "location": {
+            "street": {"number": rnd.randint(1, 9999), "name": f"street {i}"},
+            "city": f"city {i % 500}",
+            "state": f"state {i % 50}",
+            "country": f"country {i % 20}",
+            "postcode": rnd.randint(10000, 99999),
+            "coordinates": {"latitude": str(rnd.uniform(-90, 90)), "longitude": str(rnd.uniform(-180, 180))},
+            "timezone": {"offset": "+1:00", "description": "Brussels, Copenhagen, Madrid, Paris"},
+        },
+        "email": f"user{i}@example.com",
+        "login": {
+            "uuid": _hex(rnd, "uuid")[:32],
+            "username": f"user{i}",
+            "password": _hex(rnd, "password")[:10],
+            "salt": _hex(rnd, "salt")[:8],
+            "md5": _hex(rnd, "md5")[:32],
+            "sha1": _hex(rnd, "sha1")[:40],
+            "sha256": _hex(rnd, "sha256"),
+        },
+        "dob": {"date": "1990-05-17T04:13:22.542Z", "age": rnd.randint(18, 90)},
+        "registered": {"date": "2012-10-02T11:54:08.813Z", "age": rnd.randint(0, 20)},
+        "phone": f"555-{i:07d}",
+        "cell": f"556-{i:07d}",
+        "id": {"name": "SSN", "value": f"{i:09d}"},
+        "picture": {
+            "large": f"https://randomuser.me/api/portraits/women/{i % 100}.jpg",
+            "medium": f"https://randomuser.me/api/portraits/med/women/{i % 100}.jpg",
+            "thumbnail": f"https://randomuser.me/api/portraits/thumb/women/{i % 100}.jpg",
+        },
+        "nat": "FR",
+    }
+
+
+def _jsonplaceholder(rnd, i):
+    return {
+        "id": i,
+        "name": f"name {i}",
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "address": {
+            "street": f"street {i}",
+            "suite": f"Apt. {i % 1000}",
+            "city": f"city {i % 500}",
+            "zipcode": f"{rnd.randint(10000, 99999)}",
+            "geo": {"lat": str(rnd.uniform(-90, 90)), "lng": str(rnd.uniform(-180, 180))},
+        },
+        "phone": f"555-{i:07d}",
+        "website": f"user{i}.example.com",
+        "company": {"name": f"company {i}", "catchPhrase": "Multi-layered client-server neural-net", "bs": "harness real-time e-markets"},
+    }
+
+
+def synthetic_payload(kind, rows, seed=0):
+    rnd = random.Random(seed)
+    if kind == "randomuser":
+        return json.dumps({"results": [_randomuser(rnd, i) for i in range(rows)]}).encode()
+    return json.dumps([_jsonplaceholder(rnd, i) for i in range(rows)]).encode()
+
+
+class _FakeClient:
+    # boto3 stand-in, keeps the run local and records written bytes
+
+    def __init__(self, proxy_url):
+        self.proxy_url = proxy_url
+        self.written = 0
+
+    def get_secret_value(self, SecretId):
+        return {"SecretString": json.dumps({"PROXY_URL": self.proxy_url})}
+
+    def head_object(self, **kwargs):
+        from botocore.exceptions import ClientError
+        raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+    def put_object(self, **kwargs):
+        self.written += len(kwargs["Body"])
+        return {}
+
+
+def _serve(payload):
+    class Handler(BaseHTTPRequestHandler):
+        # answers direct and proxied requests alike
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _limit_memory(memory_mb):
+    # cap the address space growth to what is left of the budget after imports
+    import resource
+    with open("/proc/self/status") as f:
+        status = dict(x.split(":", 1) for x in f.read().splitlines() if ":" in x)
+    vm_size = int(status["VmSize"].split()[0]) * 1024
+    rss = int(status["VmRSS"].split()[0]) * 1024
+    budget = max(memory_mb * 1024 * 1024 - rss, 0)
+    resource.setrlimit(resource.RLIMIT_AS, (vm_size + budget, vm_size + budget))
+
+
+def run_worker(function_id, rows, memory_mb, url):
+    # the payload is built and served by the parent so neither counts towards
+    # the peak memory or cpu time of the measured process
+    import resource
+    module_name, kind = FUNCTIONS[function_id]
+    sys.path.insert(0, LAMBDA_DIR)
+    module = importlib.import_module(module_name)
+    fake = _FakeClient(url)
+    module.client = lambda *args, **kwargs: fake
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "http_proxy", "https_proxy"):
+        os.environ.pop(name, None)
+    os.environ.update({
+        "ENDPOINT_URL": f"{url}/api",
+        "S3_BUCKET": "rightsizing",
+        "S3_PREFIX": f"{kind}/",
+        "S3_COLD_PREFIX": f"{kind}_pii/",
+        "S3_RAW_PREFIX": f"{kind}_raw/",
+        "IDEMPOTENT_WRITES": "true",
+    })
+    _limit_memory(memory_mb)
+
+    result = {"function": function_id, "rows": rows, "memory_mb": memory_mb}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        module.consume_api({}, None)
+        result["ok"] = True
+    except MemoryError:
+        result.update(ok=False, error="MemoryError")
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    # ru_maxrss is in KB on linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    # below one vCPU lambda throttles cpu proportionally to memory
+    cpu_scale = max(1.0, FULL_VCPU_MB / memory_mb)
+    result.update(
+        wall_s=wall,
+        cpu_s=cpu,
+        latency_s=max(wall - cpu, 0) + cpu * cpu_scale,
+        peak_mb=peak_mb,
+        written_bytes=fake.written,
+    )
+    if peak_mb > memory_mb:
+        result.update(ok=False, error="peak memory over cap")
+    return result
+
+
+def measure(function_id, rows, memory_mb, url, timeout=900):
+    cmd = [sys.executable, "-m", "api_consumer.rightsizing", "--worker", function_id, str(rows), str(memory_mb), url]
+    root = os.path.dirname(LAMBDA_DIR)
+    try:
+        proc = subprocess.run(cmd, cwd=root, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"function": function_id, "rows": rows, "memory_mb": memory_mb, "ok": False, "error": "timeout"}
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode or not lines:
+        # killed or crashed while allocating, treat as out of memory
+        error = (proc.stderr.strip().splitlines() or ["exit %d" % proc.returncode])[-1]
+        return {"function": function_id, "rows": rows, "memory_mb": memory_mb, "ok": False, "error": error}
+    return json.loads(lines[-1])
+
+
+def recommend(results, headroom=1.25, timeout_factor=3.0, io_latency=5.0):
+    # smallest memory where every payload fits with headroom, timeout from its slowest
+    # run plus the network, proxy, S3 round trips and cold start a local run skips
+    by_memory = {}
+    for result in results:
+        by_memory.setdefault(result["memory_mb"], []).append(result)
+    fits = [
+        memory for memory, runs in sorted(by_memory.items())
+        if all(x["ok"] and x["peak_mb"] * headroom <= memory for x in runs)
+    ]
+    if not fits:
+        return None
+    memory = fits[0]
+    latency = max(x["latency_s"] for x in by_memory[memory])
+    return {
+        "memory_size": memory,
+        "timeout": min(900, max(DEFAULT_PROFILE["timeout"], math.ceil((latency + io_latency) * timeout_factor))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Right-size the consumer lambdas")
+    parser.add_argument("--functions", nargs="+", default=list(FUNCTIONS), choices=list(FUNCTIONS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100, 1000, 5000])
+    parser.add_argument("--memory", nargs="+", type=int, default=[128, 256, 512, 1024, 1769])
+    parser.add_argument("--headroom", type=float, default=1.25)
+    parser.add_argument(
+        "--io-latency",
+        type=float,
+        default=5.0,
+        help="seconds of endpoint/proxy fetch, S3 HeadObject+PutObject and cold start to add to each run",
+    )
+    parser.add_argument("--output", default="rightsizing.json")
+    parser.add_argument("--worker", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if not sys.platform.startswith("linux"):
+        # memory caps need /proc and RLIMIT_AS, peak memory assumes ru_maxrss in KB
+        parser.error("the right-sizing harness only runs on Linux")
+
+    if args.worker:
+        function_id, rows, memory_mb, url = args.worker
+        print(json.dumps(run_worker(function_id, int(rows), int(memory_mb), url)))
+        return
+
+    profile = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            profile = json.load(f)
+    for function_id in args.functions:
+        results = []
+        for rows in args.sizes:
+            payload = synthetic_payload(FUNCTIONS[function_id][1], rows)
+            server, url = _serve(payload)
+            try:
+                for memory_mb in args.memory:
+                    result = measure(function_id, rows, memory_mb, url)
+                    result["payload_bytes"] = len(payload)
+                    results.append(result)
+                    status = "ok" if result["ok"] else result["error"]
+                    print(
+                        f"{function_id} memory={memory_mb}MB rows={rows} "
+                        f"latency={result.get('latency_s', 0):.3f}s peak={result.get('peak_mb', 0):.0f}MB {status}"
+                    )
+            finally:
+                server.shutdown()
+                server.server_close()
+        recommendation = recommend(results, args.headroom, io_latency=args.io_latency)
+        if recommendation is None:
+            print(f"{function_id}: no memory size fits every payload, keeping previous profile")
+            continue
+        print(f"{function_id}: {recommendation}")
+        # the architecture is not measured, keep whatever the profile sets
+        profile[function_id] = dict(profile.get(function_id, {}), **recommendation)
+
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from collections import namedtuple
+
+# column shared by the hot and cold datasets of a run
+ROW_KEY = "row_key"
+
+# a loaded results object: memory-mapped arrow table plus its hash indexes
+Snapshot = namedtuple("Snapshot", ["key", "path", "table", "index"])
+
+
+class LocalSource:
+    # results layout stored in a local directory
+
+    def __init__(self, root):
+        self.root = root
+
+    def list(self, prefix):
+        keys = []
+        for path, _, files in os.walk(os.path.join(self.root, prefix)):
+            for name in files:
+                if name.endswith(".parquet"):
+                    key = os.path.relpath(os.path.join(path, name), self.root)
+                    keys.append(key.replace(os.sep, "/"))
+        return keys
+
+    def read(self, key):
+        return pq.read_table(os.path.join(self.root, key))
+
+
+class S3Source:
+    # results layout stored in a bucket, any boto3 compatible client works
+
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def list(self, prefix):
+        keys = []
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            res = self.client.list_objects_v2(**kwargs)
+            keys += [x["Key"] for x in res.get("Contents", []) if x["Key"].endswith(".parquet")]
+            if not res.get("IsTruncated"):
+                return keys
+            kwargs["ContinuationToken"] = res["NextContinuationToken"]
+
+    def read(self, key):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        return pq.read_table(pa.BufferReader(body))
+
+
+class SnapshotCache:
+    # keeps the latest `keep` objects of a prefix in memory-mapped arrow
+    # files and answers lookups on `index_columns` from hash indexes. With a
+    # `cold_prefix` every hot object is joined on row_key to the cold object
+    # of the same run, so PII keys and analytic columns come back as one row
+
+    def __init__(self, source, prefix, keep=1, index_columns=(), cache_dir=None, cold_prefix=None):
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+        self.source = source
+        self.prefix = prefix
+        self.cold_prefix = cold_prefix
+        self.keep = keep
+        self.index_columns = list(index_columns)
+        # a temporary cache dir is owned by the cache and removed on close
+        self._owns_cache_dir = cache_dir is None
+        self.cache_dir = cache_dir or tempfile.mkdtemp(prefix="snapshot_cache_")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # key -> Snapshot, oldest first
+        self.snapshots = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        # drop the arrow copies, and the cache dir when it was created here
+        snapshots, self.snapshots = self.snapshots, {}
+        if self._owns_cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            return
+        for snapshot in snapshots.values():
+            if os.path.exists(snapshot.path):
+                os.remove(snapshot.path)
+
+    def refresh(self):
+        # keys are date partitioned so lexical order is write order
+        keys = sorted(self.source.list(self.prefix))[-self.keep:]
+        new_keys = [x for x in keys if x not in self.snapshots]
+        for key in [x for x in self.snapshots if x not in keys]:
+            os.remove(self.snapshots.pop(key).path)
+        # hot and cold objects of a run share the same name under their prefix
+        cold_keys = set()
+        if self.cold_prefix and new_keys:
+            cold_keys = set(self.source.list(self.cold_prefix))
+        for key in new_keys:
+            cold_key = self.cold_prefix + key[len(self.prefix):] if self.cold_prefix else None
+            self.snapshots[key] = self._load(key, cold_key if cold_key in cold_keys else None)
+        self.snapshots = {x: self.snapshots[x] for x in keys}
+        return new_keys
+
+    def latest(self):
+        if not self.snapshots:
+            return None
+        return next(reversed(self.snapshots.values())).table
+
+    def get(self, column, value):
+        # point lookup, the newest snapshot holding the value wins
+        for snapshot in reversed(self.snapshots.values()):
+            rows = self._rows(snapshot, column, value)
+            if rows:
+                return snapshot.table.slice(rows[-1], 1).to_pylist()[0]
+        return None
+
+    def filter(self, **conditions):
+        # equality filter over every cached snapshot, newest first
+        if not conditions:
+            raise ValueError("at least one condition is required")
+        indexed = [x for x in conditions if x in self.index_columns]
+        tables = []
+        for snapshot in reversed(self.snapshots.values()):
+            table = snapshot.table
+            if any(x not in table.column_names for x in conditions):
+                continue
+            if indexed:
+                table = table.take(self._rows(snapshot, indexed[0], conditions[indexed[0]]))
+            for column, value in conditions.items():
+                if indexed and column == indexed[0]:
+                    continue
+                table = table.filter(pc.equal(table[column], value))
+            if table.num_rows:
+                tables.append(table)
+        if not tables:
+            return None
+        return pa.concat_tables(tables, promote_options="default")
+
+    def _rows(self, snapshot, column, value):
+        if column not in self.index_columns:
+            raise ValueError(f"{column} is not an indexed column")
+        return snapshot.index.get(column, {}).get(value, [])
+
+    def _load(self, key, cold_key=None):
+        # spill to an arrow ipc file so the table is served from a memory map
+        path = os.path.join(self.cache_dir, key.replace("/", "_") + ".arrow")
+        table = self.source.read(key)
+        if cold_key:
+            # runs written before the split have no cold object and keep every column
+            cold = self.source.read(cold_key)
+            table = table.drop_columns([x for x in cold.column_names if x != ROW_KEY and x in table.column_names])
+            table = table.join(cold, ROW_KEY, join_type="left outer")
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        index = {}
+        for column in self.index_columns:
+            if column not in table.column_names:
+                continue
+            index[column] = {}
+            for row, value in enumerate(table[column].to_pylist()):
+                if value is not None:
+                    index[column].setdefault(value, []).append(row)
+        return Snapshot(key, path, table, index)
@@ -50,4 +50,38 @@ JSON_PLACEHOLDER_SCHEMA = {
     "company_name": "string",
     "company_catchphrase": "string",
     "company_bs": "string"
-}
\ No newline at end of file
+}
+
+# column shared by the hot and cold datasets to join them back
+ROW_KEY = "row_key"
+
+# PII and wide blob columns written to the cold dataset
+RAMDON_USER_COLD_COLUMNS = [
+    "email",
+    "phone",
+    "cell",
+    "nat",
+    "name_title",
+    "name_first",
+    "name_last",
+    "login_uuid",
+    "login_username",
+    "login_password",
+    "login_salt",
+    "login_md5",
+    "login_sha1",
+    "login_sha256",
+    "id_name",
+    "id_value",
+    "picture_large",
+    "picture_medium",
+    "picture_thumbnail"
+]
+
+JSON_PLACEHOLDER_COLD_COLUMNS = [
+    "name",
+    "username",
+    "email",
+    "phone",
+    "website"
+]
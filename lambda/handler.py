@@ -1,11 +1,10 @@
-import uuid
 from os import getenv
 from json import loads
 from boto3 import client
 from pandas import json_normalize
 from urllib.request import urlopen
-from datetime import datetime, timezone
-from constants import JSON_PLACEHOLDER_SCHEMA
+from writer import is_replayable, run_identity, load_response, split_hot_cold, put_parquet, CONFLICT
+from constants import JSON_PLACEHOLDER_SCHEMA, JSON_PLACEHOLDER_COLD_COLUMNS
 
 def consume_api(event, context):
     # validate env variables
@@ -20,32 +19,49 @@ def consume_api(event, context):
     prefix = getenv("S3_PREFIX", "")
     if not bucket:
         raise RuntimeError("S3_PREFIX not configured")
+
+    cold_prefix = getenv("S3_COLD_PREFIX")
+    if not cold_prefix:
+        raise RuntimeError("S3_COLD_PREFIX not configured")
+
+    idempotent = getenv("IDEMPOTENT_WRITES", "false").lower() == "true"
+
+    raw_prefix = getenv("S3_RAW_PREFIX")
+    if idempotent and not raw_prefix:
+        raise RuntimeError("S3_RAW_PREFIX not configured")
     
     # make request
-    with urlopen(endpoint) as resp:
-        code = resp.code
-        if code >= 200 and code < 400:
-            content = resp.read()
-            # make path
-            now = datetime.now(timezone.utc)
-            date_path = now.strftime("%Y/%m/%d")
-            time_part = now.strftime("%H%M%S")
-            key = f"{prefix}{date_path}/{time_part}-{uuid.uuid4().hex}.parquet"
-            # read data 
-            obj = loads(content.decode("utf-8"))
-            df = json_normalize(obj, sep="_")
-            df.columns = [x.lower() for x in df.columns]
-            df = df.astype(JSON_PLACEHOLDER_SCHEMA)
-            # put on s3
-            # put on s3
-            s3 = client("s3")
-            s3.put_object(
-                Bucket=bucket,
-                Key=key,
-                Body=df.to_parquet(),
-                ContentType="application/vnd.apache.parquet",
-            )
-            return "request succesfully"
-        else:
+    def fetch():
+        with urlopen(endpoint) as resp:
+            code = resp.code
+            if code >= 200 and code < 400:
+                return resp.read()
             raise ValueError("Error {code} in {endpoint} request")
-    return 
\ No newline at end of file
+
+    # make path
+    now, run_id = run_identity(event, endpoint, idempotent)
+    date_path = now.strftime("%Y/%m/%d")
+    time_part = now.strftime("%H%M%S")
+    key = f"{prefix}{date_path}/{time_part}-{run_id}.parquet"
+    cold_key = f"{cold_prefix}{date_path}/{time_part}-{run_id}.parquet"
+    raw_key = f"{raw_prefix}{date_path}/{time_part}-{run_id}.json"
+
+    # retries of a scheduled run reuse the stored response instead of fetching again
+    s3 = client("s3")
+    content = load_response(s3, bucket, raw_key, fetch, is_replayable(event, idempotent))
+
+    # read data
+    obj = loads(content.decode("utf-8"))
+    df = json_normalize(obj, sep="_")
+    df.columns = [x.lower() for x in df.columns]
+    df = df.astype(JSON_PLACEHOLDER_SCHEMA)
+    # split analytic and PII/blob columns
+    hot_df, cold_df = split_hot_cold(df, JSON_PLACEHOLDER_COLD_COLUMNS, run_id)
+
+    # put on s3, cold first so analytic rows never show up without their PII half
+    for part_key, part_df in ((cold_key, cold_df), (key, hot_df)):
+        if put_parquet(s3, bucket, part_key, part_df, idempotent) == CONFLICT:
+            # both halves are split from the stored response, a different object
+            # means the run keys are taken by rows this run can not reproduce
+            raise RuntimeError(f"{part_key} already exists with different content")
+    return "request succesfully"
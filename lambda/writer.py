@@ -0,0 +1,103 @@
+import uuid
+from hashlib import sha256
+from constants import ROW_KEY
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+
+# put_parquet outcomes
+WRITTEN = "written"
+SKIPPED = "skipped"
+CONFLICT = "conflict"
+
+
+def is_replayable(event, idempotent):
+    # manual invocations carry no schedule time, nothing to deduplicate against
+    return idempotent and isinstance(event, dict) and bool(event.get("time"))
+
+
+def run_identity(event, endpoint, idempotent):
+    # time and id used to build the object keys of a run
+    now = datetime.now(timezone.utc)
+    if not is_replayable(event, idempotent):
+        return now, uuid.uuid4().hex
+    # retries redeliver the same event, so the key only depends on the request:
+    # schedule time plus endpoint. The response body is left out, randomuser
+    # answers every call with different users
+    when = datetime.fromisoformat(event["time"].replace("Z", "+00:00"))
+    return when, sha256(f"{event['time']}\n{endpoint}".encode("utf-8")).hexdigest()[:32]
+
+
+def _not_found(e):
+    return e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound")
+
+
+def load_response(s3, bucket, key, fetch, replayable):
+    # the raw response of a replayable run is stored once under its request key
+    # and every retry splits that copy, so the hot and cold halves always come
+    # from the same rows even when the endpoint answers differently each call
+    if not replayable:
+        return fetch()
+    try:
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as e:
+        if not _not_found(e):
+            raise
+    content = fetch()
+    try:
+        s3.put_object(Bucket=bucket, Key=key, Body=content, ContentType="application/json", IfNoneMatch="*")
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "PreconditionFailed":
+            raise
+        # a concurrent attempt stored its response first, use that one
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    return content
+
+
+def split_hot_cold(df, cold_columns, run_id):
+    # tag every row with a key shared by both datasets
+    df = df.copy()
+    df.insert(0, ROW_KEY, [f"{run_id}-{i}" for i in range(len(df))])
+    # analytic columns go to the hot dataset, PII/blobs to the cold one
+    hot = [x for x in df.columns if x not in cold_columns]
+    cold = [ROW_KEY] + [x for x in df.columns if x in cold_columns]
+    return df[hot], df[cold]
+
+
+def put_parquet(s3, bucket, key, df, idempotent=False):
+    # an existing object is never overwritten: same checksum is a skipped retry,
+    # a different one is a conflict left for the caller to handle
+    body = df.to_parquet()
+    if not idempotent:
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/vnd.apache.parquet",
+        )
+        return WRITTEN
+
+    checksum = sha256(body).hexdigest()
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        if not _not_found(e):
+            raise
+        head = None
+    if head:
+        return SKIPPED if head.get("Metadata", {}).get("sha256") == checksum else CONFLICT
+
+    # only create when absent so a concurrent retry can not overwrite it
+    try:
+        s3.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=body,
+            ContentType="application/vnd.apache.parquet",
+            Metadata={"sha256": checksum},
+            IfNoneMatch="*",
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "PreconditionFailed":
+            raise
+        return CONFLICT
+    return WRITTEN
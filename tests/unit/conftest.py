@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import hashlib
+from importlib.metadata import version
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# stack id -> (module, class) synthesized by the harness
+STACKS = {
+    "JsonPlaceholderStack": ("api_consumer.json_placeholder_consume", "JsonPlaceHolderConsumerStack"),
+    "RandomUserStack": ("api_consumer.json_randomuser_consume", "RandomUserConsumerStack"),
+}
+
+# synth seconds of this session, None when served from the snapshot cache
+SYNTH_TIMES = {}
+
+
+def _sources_digest():
+    # templates only change when the stack code, its context, the lambda asset
+    # or the installed cdk libraries do
+    digest = hashlib.sha256()
+    for package in ("aws-cdk-lib", "constructs"):
+        digest.update(f"{package}=={version(package)}\n".encode())
+    paths = ["cdk.json", "rightsizing.json", "requirements.txt"]
+    for folder in ("api_consumer", "lambda"):
+        paths += [
+            os.path.join(folder, x) for x in sorted(os.listdir(os.path.join(ROOT, folder)))
+            if x.endswith(".py")
+        ]
+    for path in paths:
+        digest.update(path.encode())
+        with open(os.path.join(ROOT, path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _synth(stack_id):
+    import importlib
+    import aws_cdk
+
+    with open(os.path.join(ROOT, "cdk.json")) as f:
+        context = json.load(f)["context"]
+    module_name, class_name = STACKS[stack_id]
+    stack_class = getattr(importlib.import_module(module_name), class_name)
+    app = aws_cdk.App(context=context)
+    stack = stack_class(app, stack_id, **context["dev"])
+    return aws_cdk.assertions.Template.from_stack(stack).to_json()
+
+
+@pytest.fixture(scope="session")
+def templates(request):
+    # synthesize every stack once per session, reuse snapshots while sources are unchanged
+    from aws_cdk.assertions import Template
+
+    # -p no:cacheprovider leaves no config.cache, every stack is synthesized then
+    cache = getattr(request.config, "cache", None)
+    digest = _sources_digest()
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        result = {}
+        for stack_id in STACKS:
+            cache_key = f"api_consumer/templates/{stack_id}"
+            cached = cache.get(cache_key, None) if cache else None
+            if cached and cached["digest"] == digest:
+                SYNTH_TIMES[stack_id] = None
+                template = cached["template"]
+            else:
+                start = time.perf_counter()
+                template = _synth(stack_id)
+                SYNTH_TIMES[stack_id] = time.perf_counter() - start
+                if cache:
+                    cache.set(cache_key, {"digest": digest, "template": template})
+                    cache.set(f"api_consumer/synth_seconds/{stack_id}", SYNTH_TIMES[stack_id])
+            result[stack_id] = Template.from_json(template)
+        return result
+    finally:
+        os.chdir(cwd)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not SYNTH_TIMES:
+        return
+    terminalreporter.section("cdk synth")
+    cache = getattr(config, "cache", None)
+    for stack_id, seconds in SYNTH_TIMES.items():
+        last = cache.get(f"api_consumer/synth_seconds/{stack_id}", None) if cache else None
+        if seconds is None:
+            detail = "snapshot cache hit" + (f" (last synth {last:.2f}s)" if last else "")
+        else:
+            detail = f"synthesized in {seconds:.2f}s"
+        terminalreporter.write_line(f"{stack_id}: {detail}")
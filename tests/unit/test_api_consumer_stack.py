@@ -1,15 +1,136 @@
-import aws_cdk as core
+import os
+
+import pytest
 import aws_cdk.assertions as assertions
 
-from api_consumer.api_consumer_stack import ApiConsumerStack
+from api_consumer.rightsizing import load_profile
+from api_consumer.json_randomuser_consume import RANDOM_USER_COLD_COLUMNS
+from api_consumer.json_placeholder_consume import JSON_PLACEHOLDER_COLD_COLUMNS
+
+PROFILE = os.path.join(os.path.dirname(__file__), "..", "..", "rightsizing.json")
+
+DATASETS = [
+    ("RandomUserStack", "randomuser", RANDOM_USER_COLD_COLUMNS),
+    ("JsonPlaceholderStack", "jsonplaceholder", JSON_PLACEHOLDER_COLD_COLUMNS),
+]
+
+FUNCTIONS = {
+    "RandomUserStack": "HttpConsumerRandomUserFunction",
+    "JsonPlaceholderStack": "HttpConsumerJSONPlaceholderFunction",
+}
+
+
+@pytest.mark.parametrize("stack_id, dataset, cold_columns", DATASETS)
+def test_consumer_function(templates, stack_id, dataset, cold_columns):
+    template = templates[stack_id]
+    profile = load_profile(PROFILE, FUNCTIONS[stack_id])
+    template.resource_count_is("AWS::Lambda::Function", 1)
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Runtime": "python3.11",
+        "Timeout": profile["timeout"],
+        "MemorySize": profile["memory_size"],
+        "Architectures": [profile["architecture"]],
+        "Environment": {
+            "Variables": assertions.Match.object_like({
+                "S3_PREFIX": f"{dataset}/",
+                "S3_COLD_PREFIX": f"{dataset}_pii/",
+                "S3_RAW_PREFIX": f"{dataset}_raw/",
+                "IDEMPOTENT_WRITES": "true",
+            })
+        },
+    })
+    template.has_resource_properties("AWS::S3::Bucket", {
+        "LifecycleConfiguration": {
+            "Rules": [{"Prefix": f"{dataset}_raw/", "ExpirationInDays": 7, "Status": "Enabled"}]
+        },
+    })
+    template.resource_count_is("AWS::Events::Rule", 1)
+
+
+@pytest.mark.parametrize("stack_id, dataset, cold_columns", DATASETS)
+def test_glue_tables_split_hot_and_cold(templates, stack_id, dataset, cold_columns):
+    template = templates[stack_id]
+    template.resource_count_is("AWS::Glue::Table", 2)
+    tables = template.find_resources("AWS::Glue::Table")
+    columns = {
+        x["Properties"]["TableInput"]["Name"]: [
+            c["Name"] for c in x["Properties"]["TableInput"]["StorageDescriptor"]["Columns"]
+        ]
+        for x in tables.values()
+    }
+    hot = columns[f"api_consumer_{dataset}"]
+    cold = columns[f"api_consumer_{dataset}_pii"]
+    assert hot[0] == cold[0] == "row_key"
+    assert cold[1:] == cold_columns
+    assert not set(hot) & set(cold_columns)
+
+    # the handlers write parquet to the cold prefix
+    template.has_resource_properties("AWS::Glue::Table", {
+        "TableInput": assertions.Match.object_like({
+            "Name": f"api_consumer_{dataset}_pii",
+            "Parameters": {"classification": "parquet"},
+            "StorageDescriptor": assertions.Match.object_like({
+                "InputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+                "OutputFormat": "org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+                "SerdeInfo": {
+                    "SerializationLibrary": "org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe"
+                },
+            }),
+        })
+    })
+
+    crawler = template.find_resources("AWS::Glue::Crawler")
+    targets = list(crawler.values())[0]["Properties"]["Targets"]["S3Targets"]
+    assert len(targets) == 2
+
+
+@pytest.mark.parametrize("stack_id, dataset, cold_columns", DATASETS)
+def test_lake_formation_hides_pii(templates, stack_id, dataset, cold_columns):
+    template = templates[stack_id]
+    # the hot table keeps excluding PII, pre-split objects still carry it
+    template.has_resource_properties("AWS::LakeFormation::Permissions", {
+        "Permissions": ["SELECT"],
+        "Resource": {
+            "TableWithColumnsResource": assertions.Match.object_like({
+                "Name": f"api_consumer_{dataset}",
+                "ColumnWildcard": {"ExcludedColumnNames": cold_columns},
+            })
+        },
+    })
+    template.has_resource_properties("AWS::LakeFormation::Permissions", {
+        "Permissions": ["SELECT"],
+        "Resource": {
+            "TableWithColumnsResource": assertions.Match.object_like({
+                "Name": f"api_consumer_{dataset}_pii",
+                "ColumnWildcard": {"ExcludedColumnNames": cold_columns},
+            })
+        },
+    })
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in api_consumer/api_consumer_stack.py
-def test_sqs_queue_created():
-    app = core.App()
-    stack = ApiConsumerStack(app, "api-consumer")
-    template = assertions.Template.from_stack(stack)
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+def test_deployed_logical_ids_are_kept(templates):
+    # renaming these would replace named glue/athena resources on deploy
+    expected = {
+        "RandomUserStack": [
+            "JsonRandomUserResultsBucket",
+            "HttpConsumerRandomUserFunction",
+            "RamdonUserSchedule",
+            "RandomUserGlueDatabase",
+            "RandomUserGlueTable",
+            "RandomUserAthenaWorkGroup",
+            "LfPermsAthenaSelectRandomUserColumns",
+        ],
+        "JsonPlaceholderStack": [
+            "JsonPlaceholderConsumerResultsBucket",
+            "HttpConsumerJSONPlaceholderFunction",
+            "JsonPlaceholderSchedule",
+            "JsonPlaceholderGlueDatabase",
+            "RandomUserGlueTable",
+            "JsonPlaceholderAthenaWorkGroup",
+            "LfPermsAthenaSelectRandomUserColumns",
+        ],
+    }
+    for stack_id, ids in expected.items():
+        resources = templates[stack_id].to_json()["Resources"]
+        for construct_id in ids:
+            assert any(x.startswith(construct_id) for x in resources), construct_id
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+from api_consumer.api_consumer_stack import ROW_KEY
+from api_consumer.json_randomuser_consume import RANDOM_USER_COLUMNS, RANDOM_USER_COLD_COLUMNS
+from api_consumer.json_placeholder_consume import JSON_PLACEHOLDER_COLUMNS, JSON_PLACEHOLDER_COLD_COLUMNS
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lambda"))
+
+import constants  # noqa: E402
+
+# pandas dtype written by the lambda -> glue column type declared by the stack
+GLUE_TYPES = {
+    "string": "string",
+    "float32": "double",
+    "Int16": "smallint",
+    "datetime64[ns, UTC]": "timestamp",
+}
+
+DATASETS = [
+    (RANDOM_USER_COLUMNS, RANDOM_USER_COLD_COLUMNS, constants.RAMDON_USER_SCHEMA, constants.RAMDON_USER_COLD_COLUMNS),
+    (JSON_PLACEHOLDER_COLUMNS, JSON_PLACEHOLDER_COLD_COLUMNS, constants.JSON_PLACEHOLDER_SCHEMA, constants.JSON_PLACEHOLDER_COLD_COLUMNS),
+]
+
+
+def test_row_key_matches():
+    assert ROW_KEY == constants.ROW_KEY
+
+
+@pytest.mark.parametrize("columns, cold_columns, schema, lambda_cold_columns", DATASETS)
+def test_stack_columns_match_lambda(columns, cold_columns, schema, lambda_cold_columns):
+    # glue schema and LF exclusions must describe what the lambda writes
+    assert columns == [(name, GLUE_TYPES[dtype]) for name, dtype in schema.items()]
+    assert cold_columns == lambda_cold_columns
+    assert set(cold_columns) <= set(schema)
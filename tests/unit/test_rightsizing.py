@@ -0,0 +1,41 @@
+import json
+
+from api_consumer.rightsizing import DEFAULT_PROFILE, load_profile, recommend
+
+
+def run(memory_mb, peak_mb, latency_s, ok=True):
+    return {"memory_mb": memory_mb, "peak_mb": peak_mb, "latency_s": latency_s, "ok": ok}
+
+
+def test_recommend_picks_smallest_memory_with_headroom():
+    results = [
+        run(128, 120, 9.0),
+        run(128, 0, 0, ok=False),
+        run(256, 180, 4.0),
+        run(256, 215, 5.0),
+        run(512, 215, 2.0),
+        run(512, 230, 2.5),
+    ]
+    recommendation = recommend(results, headroom=1.25, timeout_factor=3.0)
+    assert recommendation["memory_size"] == 512
+    # a fast local run never goes below the current 60 s timeout
+    assert recommendation["timeout"] == 60
+    assert "architecture" not in recommendation
+
+
+def test_recommend_adds_io_latency():
+    recommendation = recommend([run(1024, 300, 20.0)], timeout_factor=3.0, io_latency=5.0)
+    assert recommendation["timeout"] == 75
+
+
+def test_recommend_without_fit():
+    assert recommend([run(128, 200, 1.0)]) is None
+
+
+def test_load_profile(tmp_path):
+    path = tmp_path / "rightsizing.json"
+    path.write_text(json.dumps({"HttpConsumerRandomUserFunction": {"memory_size": 512}}))
+    profile = load_profile(str(path), "HttpConsumerRandomUserFunction")
+    assert profile == dict(DEFAULT_PROFILE, memory_size=512)
+    assert load_profile(str(path), "HttpConsumerJSONPlaceholderFunction") == DEFAULT_PROFILE
+    assert load_profile(None, "HttpConsumerRandomUserFunction") == DEFAULT_PROFILE
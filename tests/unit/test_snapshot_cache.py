@@ -0,0 +1,150 @@
+import io
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from api_consumer.snapshot_cache import LocalSource, S3Source, SnapshotCache
+
+
+def write_snapshot(root, key, rows):
+    path = root / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+
+def test_snapshot_cache_lookups_and_refresh(tmp_path):
+    write_snapshot(tmp_path, "randomuser_pii/2025/01/01/010000-a.parquet", [
+        {"login_uuid": "u1", "email": "old@example.com"},
+        {"login_uuid": "u2", "email": "two@example.com"},
+    ])
+    cache = SnapshotCache(
+        LocalSource(str(tmp_path)),
+        "randomuser_pii/",
+        keep=2,
+        index_columns=["login_uuid", "email"],
+        cache_dir=str(tmp_path / "cache"),
+    )
+    assert cache.refresh() == ["randomuser_pii/2025/01/01/010000-a.parquet"]
+    assert cache.get("login_uuid", "u2")["email"] == "two@example.com"
+
+    # only new objects are loaded and the newest snapshot wins
+    write_snapshot(tmp_path, "randomuser_pii/2025/01/02/010000-b.parquet", [
+        {"login_uuid": "u1", "email": "new@example.com"},
+    ])
+    assert cache.refresh() == ["randomuser_pii/2025/01/02/010000-b.parquet"]
+    assert cache.get("login_uuid", "u1")["email"] == "new@example.com"
+    assert cache.latest().num_rows == 1
+    assert cache.filter(login_uuid="u1").column("email").to_pylist() == [
+        "new@example.com",
+        "old@example.com",
+    ]
+    assert cache.get("email", "missing@example.com") is None
+
+    # snapshots outside the window are evicted
+    write_snapshot(tmp_path, "randomuser_pii/2025/01/03/010000-c.parquet", [
+        {"login_uuid": "u3", "email": "three@example.com"},
+    ])
+    cache.refresh()
+    assert cache.get("login_uuid", "u2") is None
+    assert len(cache.snapshots) == 2
+
+
+def test_snapshot_cache_close_removes_its_files(tmp_path):
+    write_snapshot(tmp_path, "jsonplaceholder_pii/2025/01/01/010000-a.parquet", [{"email": "a@example.com"}])
+    source = LocalSource(str(tmp_path))
+
+    # a temporary cache dir is removed entirely
+    with SnapshotCache(source, "jsonplaceholder_pii/", index_columns=["email"]) as cache:
+        cache.refresh()
+        cache_dir = cache.cache_dir
+        assert os.listdir(cache_dir)
+    assert not os.path.exists(cache_dir)
+
+    # a caller provided dir is kept, only the arrow copies go away
+    cache = SnapshotCache(source, "jsonplaceholder_pii/", cache_dir=str(tmp_path / "cache"))
+    cache.refresh()
+    cache.close()
+    assert os.listdir(tmp_path / "cache") == []
+    assert cache.snapshots == {}
+
+
+def test_snapshot_cache_joins_hot_and_cold(tmp_path):
+    write_snapshot(tmp_path, "randomuser/2025/01/01/010000-a.parquet", [
+        {"row_key": "a-0", "gender": "female", "location_city": "paris"},
+        {"row_key": "a-1", "gender": "male", "location_city": "lyon"},
+    ])
+    write_snapshot(tmp_path, "randomuser_pii/2025/01/01/010000-a.parquet", [
+        {"row_key": "a-1", "login_uuid": "u2", "email": "two@example.com"},
+        {"row_key": "a-0", "login_uuid": "u1", "email": "one@example.com"},
+    ])
+    # a run from before the split, the hot object still holds the pii columns
+    write_snapshot(tmp_path, "randomuser/2024/12/31/010000-z.parquet", [
+        {"gender": "male", "location_city": "nice", "login_uuid": "u0", "email": "zero@example.com"},
+    ])
+    with SnapshotCache(
+        LocalSource(str(tmp_path)),
+        "randomuser/",
+        keep=2,
+        index_columns=["login_uuid"],
+        cold_prefix="randomuser_pii/",
+    ) as cache:
+        cache.refresh()
+        assert cache.get("login_uuid", "u1") == {
+            "row_key": "a-0",
+            "gender": "female",
+            "location_city": "paris",
+            "login_uuid": "u1",
+            "email": "one@example.com",
+        }
+        assert cache.get("login_uuid", "u2")["location_city"] == "lyon"
+        assert cache.get("login_uuid", "u0")["location_city"] == "nice"
+        assert cache.filter(gender="male").column("email").to_pylist() == ["two@example.com", "zero@example.com"]
+
+
+class FakeS3:
+    # list_objects_v2 answers one key per page to exercise continuation tokens
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.calls = []
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        self.calls.append(ContinuationToken)
+        keys = sorted(x for x in self.objects if x.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        res = {"Contents": [{"Key": x} for x in keys[start:start + 1]], "IsTruncated": start + 1 < len(keys)}
+        if res["IsTruncated"]:
+            res["NextContinuationToken"] = str(start + 1)
+        return res
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+
+def parquet_bytes(rows):
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pylist(rows), sink)
+    return sink.getvalue().to_pybytes()
+
+
+def test_s3_source_follows_continuation_tokens():
+    s3 = FakeS3({
+        "jsonplaceholder/2025/01/01/010000-a.parquet": parquet_bytes([{"id": 1}]),
+        "jsonplaceholder/2025/01/01/010000-a.json": b"{}",
+        "jsonplaceholder/2025/01/02/010000-b.parquet": parquet_bytes([{"id": 2}]),
+        "jsonplaceholder/2025/01/03/010000-c.parquet": parquet_bytes([{"id": 3}]),
+        "jsonplaceholder_pii/2025/01/03/010000-c.parquet": parquet_bytes([{"email": "c@example.com"}]),
+    })
+    source = S3Source(s3, "results")
+    assert source.list("jsonplaceholder/") == [
+        "jsonplaceholder/2025/01/01/010000-a.parquet",
+        "jsonplaceholder/2025/01/02/010000-b.parquet",
+        "jsonplaceholder/2025/01/03/010000-c.parquet",
+    ]
+    assert s3.calls == [None, "1", "2", "3"]
+
+    with SnapshotCache(source, "jsonplaceholder/", keep=3, index_columns=["id"]) as cache:
+        cache.refresh()
+        assert cache.get("id", 2) == {"id": 2}
+        assert cache.latest().to_pylist() == [{"id": 3}]
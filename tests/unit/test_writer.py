@@ -0,0 +1,198 @@
+import io
+import os
+import sys
+import json
+import importlib
+
+import pytest
+from pandas import DataFrame, read_parquet
+from botocore.exceptions import ClientError
+
+from api_consumer.rightsizing import synthetic_payload
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "lambda"))
+
+from writer import run_identity, split_hot_cold, put_parquet, WRITTEN, SKIPPED, CONFLICT  # noqa: E402
+
+ENDPOINT = "https://example.com/api"
+
+# handler module -> dataset it writes
+HANDLERS = [("handler", "jsonplaceholder"), ("handler_with_proxy", "randomuser")]
+
+
+class FakeS3:
+    # in-memory bucket, the first put_object under each prefix in `fail` fails
+
+    def __init__(self, fail=()):
+        self.objects = {}
+        self.puts = 0
+        self.fail = set(fail)
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {"Metadata": self.objects[Key]["Metadata"]}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(self.objects[Key]["Body"])}
+
+    def put_object(self, Bucket, Key, Body, ContentType, Metadata=None, IfNoneMatch=None):
+        for prefix in [x for x in self.fail if Key.startswith(x)]:
+            self.fail.discard(prefix)
+            raise ClientError({"Error": {"Code": "InternalError"}}, "PutObject")
+        if IfNoneMatch == "*" and Key in self.objects:
+            raise ClientError({"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.puts += 1
+        self.objects[Key] = {"Body": Body, "Metadata": Metadata or {}}
+
+    def keys(self, prefix):
+        return [x for x in self.objects if x.startswith(prefix)]
+
+    def read(self, key):
+        return read_parquet(io.BytesIO(self.objects[key]["Body"]))
+
+    def get_secret_value(self, SecretId):
+        return {"SecretString": json.dumps({"PROXY_URL": "http://proxy.example.com:3128"})}
+
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.code = 200
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def read(self):
+        return self.body
+
+
+class FakeEndpoint:
+    # answers each request with the next body, like randomuser does
+
+    def __init__(self, *bodies):
+        self.bodies = list(bodies)
+        self.calls = 0
+
+    def open(self, url):
+        assert url == ENDPOINT
+        self.calls += 1
+        return FakeResponse(self.bodies.pop(0))
+
+
+def consume(monkeypatch, module_name, kind, s3, endpoint, event):
+    monkeypatch.setenv("ENDPOINT_URL", ENDPOINT)
+    monkeypatch.setenv("S3_BUCKET", "bucket")
+    monkeypatch.setenv("S3_PREFIX", f"{kind}/")
+    monkeypatch.setenv("S3_COLD_PREFIX", f"{kind}_pii/")
+    monkeypatch.setenv("S3_RAW_PREFIX", f"{kind}_raw/")
+    monkeypatch.setenv("IDEMPOTENT_WRITES", "true")
+    module = importlib.import_module(module_name)
+    monkeypatch.setattr(module, "client", lambda service: s3)
+    if module_name == "handler":
+        monkeypatch.setattr(module, "urlopen", endpoint.open)
+    else:
+        monkeypatch.setattr(module, "build_opener", lambda *handlers: endpoint)
+    return module.consume_api(event, None)
+
+
+def test_split_hot_cold():
+    df = DataFrame({
+        "email": ["a@example.com", "b@example.com", "c@example.com"],
+        "city": ["x", "y", "z"],
+        "phone": ["1", "2", "3"],
+    })
+    hot_df, cold_df = split_hot_cold(df, ["email", "phone"], "run")
+    assert list(hot_df.columns) == ["row_key", "city"]
+    assert list(cold_df.columns) == ["row_key", "email", "phone"]
+    assert len(hot_df) == len(cold_df) == len(df)
+    assert hot_df["row_key"].is_unique
+    # joining on row_key restores the original rows
+    joined = hot_df.merge(cold_df, on="row_key")[["email", "city", "phone"]]
+    assert joined.equals(df)
+
+
+def test_run_identity_is_deterministic():
+    event = {"id": "e1", "time": "2025-03-04T01:00:00Z"}
+    first = run_identity(event, "https://example.com/users", True)
+    assert first == run_identity(event, "https://example.com/users", True)
+    assert first[0].isoformat() == "2025-03-04T01:00:00+00:00"
+    assert first[1] != run_identity(event, "https://example.com/posts", True)[1]
+    assert first[1] != run_identity({"time": "2025-03-05T01:00:00Z"}, "https://example.com/users", True)[1]
+    # manual invocations without request identity get unique keys
+    assert run_identity({}, "https://example.com/users", True)[1] != run_identity({}, "https://example.com/users", True)[1]
+
+
+def test_existing_object_with_other_content_is_not_overwritten():
+    s3 = FakeS3()
+    first = DataFrame({"email": ["a@example.com"]})
+    assert put_parquet(s3, "bucket", "users/a.parquet", first, True) == WRITTEN
+    body = s3.objects["users/a.parquet"]["Body"]
+    assert put_parquet(s3, "bucket", "users/a.parquet", first, True) == SKIPPED
+    other = DataFrame({"email": ["b@example.com"]})
+    assert put_parquet(s3, "bucket", "users/a.parquet", other, True) == CONFLICT
+    assert s3.objects["users/a.parquet"]["Body"] == body
+    assert s3.puts == 1
+
+
+@pytest.mark.parametrize("module_name, kind", HANDLERS)
+def test_retry_after_failed_hot_put_writes_both_halves(monkeypatch, module_name, kind):
+    event = {"time": "2025-03-04T01:00:00Z"}
+    s3 = FakeS3(fail=[f"{kind}/"])
+    # every call to the endpoint returns other rows
+    endpoint = FakeEndpoint(synthetic_payload(kind, 3, seed=0), synthetic_payload(kind, 5, seed=1))
+
+    # the hot write fails after the raw response and the cold half landed
+    with pytest.raises(ClientError):
+        consume(monkeypatch, module_name, kind, s3, endpoint, event)
+    assert len(s3.keys(f"{kind}_raw/")) == len(s3.keys(f"{kind}_pii/")) == 1
+    assert s3.keys(f"{kind}/") == []
+
+    # the retry splits the stored response instead of the new one
+    assert consume(monkeypatch, module_name, kind, s3, endpoint, event) == "request succesfully"
+    assert endpoint.calls == 1
+    hot, cold = s3.read(s3.keys(f"{kind}/")[0]), s3.read(s3.keys(f"{kind}_pii/")[0])
+    assert len(hot) == len(cold) == 3
+    assert list(hot["row_key"]) == list(cold["row_key"])
+
+    # later retries are no-ops
+    puts = s3.puts
+    consume(monkeypatch, module_name, kind, s3, endpoint, event)
+    assert s3.puts == puts
+    assert len(s3.objects) == 3
+
+
+@pytest.mark.parametrize("module_name, kind", HANDLERS)
+def test_conflicting_hot_half_fails_the_run(monkeypatch, module_name, kind):
+    event = {"time": "2025-03-04T01:00:00Z"}
+    s3 = FakeS3()
+    endpoint = FakeEndpoint(synthetic_payload(kind, 3, seed=0), synthetic_payload(kind, 5, seed=1))
+    consume(monkeypatch, module_name, kind, s3, endpoint, event)
+    hot_key = s3.keys(f"{kind}/")[0]
+    hot = s3.objects[hot_key]
+
+    # without the stored response a retry fetches other rows, the hot object
+    # under the run key does not match them and is left alone
+    for prefix in (f"{kind}_raw/", f"{kind}_pii/"):
+        del s3.objects[s3.keys(prefix)[0]]
+    with pytest.raises(RuntimeError, match="already exists with different content"):
+        consume(monkeypatch, module_name, kind, s3, endpoint, event)
+    assert s3.objects[hot_key] == hot
+
+
+@pytest.mark.parametrize("module_name, kind", HANDLERS)
+def test_manual_invocations_write_new_runs(monkeypatch, module_name, kind):
+    s3 = FakeS3()
+    endpoint = FakeEndpoint(synthetic_payload(kind, 3, seed=0), synthetic_payload(kind, 3, seed=0))
+    consume(monkeypatch, module_name, kind, s3, endpoint, {})
+    consume(monkeypatch, module_name, kind, s3, endpoint, {})
+    # no schedule time, nothing to replay: no raw copy and two separate runs
+    assert endpoint.calls == 2
+    assert s3.keys(f"{kind}_raw/") == []
+    assert len(s3.keys(f"{kind}/")) == len(s3.keys(f"{kind}_pii/")) == 2